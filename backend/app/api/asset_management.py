@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 from app.schemas.asset import AssetManagementRequest
-from app.services.scoring import scoring_service
+from app.services.scoring import get_scoring_service
 
 router = APIRouter()
 
@@ -8,5 +8,5 @@ router = APIRouter()
 def get_asset_recommendation(request: AssetManagementRequest):
     data = request.dict()
     # The logic relies on inputs provided in the request
-    result = scoring_service.get_asset_recommendation(data)
+    result = get_scoring_service().get_asset_recommendation(data)
     return result
@@ -1,36 +1,35 @@
 import logging
 from fastapi import APIRouter, HTTPException
 from app.schemas.credit import CreditScoreRequest
-from app.services.scoring import scoring_service
+from app.services.scoring import get_scoring_service
 
-# Configure logger
-logging.basicConfig(level=logging.INFO)
+# Logging is configured centrally in app.main
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 @router.post("/score")
-def get_credit_score(request: CreditScoreRequest):
+async def get_credit_score(request: CreditScoreRequest, explain: bool = False):
     """
     Calculate credit score based on user input.
+    SHAP explainability is opt-in via ?explain=true: it costs far more than
+    the prediction itself, so the default scoring path skips it.
     """
+    # Pydantic has already validated and computed features (in schema)
+    logger.info("Received credit score request.")
+    data = request.dict()
+
     try:
-        # Pydantic has already validated and computed features (in schema)
-        logger.info("Received credit score request.")
-        data = request.dict()
-        
-        try:
-            result = scoring_service.predict_credit_score(data)
-            return result
-        except ValueError as ve:
-             logger.error(f"Validation Error: {ve}")
-             raise HTTPException(status_code=422, detail=str(ve))
-        except RuntimeError as re:
-             logger.error(f"Runtime Error: {re}")
-             raise HTTPException(status_code=500, detail=str(re))
-             
-    except HTTPException as he:
-        raise he
+        # Cache lookup and input coercion are trivial and run inline on the
+        # event loop; only the CPU-bound model call itself is awaited off
+        # the loop, so no pool thread is parked for the whole pipeline.
+        return await get_scoring_service().predict_credit_score_async(data, explain)
+    except ValueError as ve:
+        logger.error("Validation Error: %s", ve)
+        raise HTTPException(status_code=422, detail=str(ve))
+    except RuntimeError as re:
+        logger.error("Runtime Error: %s", re)
+        raise HTTPException(status_code=500, detail=str(re))
     except Exception as e:
-        logger.error(f"Unexpected error: {e}", exc_info=True)
+        logger.error("Unexpected error: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail="Internal Server Error")
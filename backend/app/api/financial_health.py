@@ -1,20 +1,14 @@
 from fastapi import APIRouter
 from app.schemas.credit import CreditScoreRequest
-from app.services.scoring import scoring_service
-from app.services.feature_engineering import compute_features
-import pandas as pd
+from app.services.scoring import get_scoring_service
 
 router = APIRouter()
 
 @router.post("/score")
 def get_financial_health_score(request: CreditScoreRequest):
-    # Need derived features. 
-    # Since we might not want to re-run the whole scoring pipeline, 
-    # we can just use the feature engineering part.
-    data = request.dict()
-    df = pd.DataFrame([data])
-    df_processed = compute_features(df)
-    features = df_processed.iloc[0].to_dict()
-    
-    result = scoring_service.calculate_financial_health(features)
+    # The schema's before-validator already computed the derived features, so
+    # request.dict() contains everything calculate_financial_health needs.
+    # Rebuilding them through a 1-row DataFrame + compute_features +
+    # iloc[0].to_dict() round-trip just redid that work per request.
+    result = get_scoring_service().calculate_financial_health(request.dict())
     return result
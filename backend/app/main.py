@@ -1,49 +1,78 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 import xgboost as xgb
 import numpy as np
 import pandas as pd
 import logging
+import logging.config
 
-# Configure logger
-logging.basicConfig(level=logging.INFO)
+# Configure logging once for the whole app; individual modules just call
+# logging.getLogger(__name__) instead of re-running basicConfig at import.
+LOGGING_CONFIG = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "default": {"format": "%(asctime)s %(levelname)s %(name)s: %(message)s"},
+    },
+    "handlers": {
+        "console": {"class": "logging.StreamHandler", "formatter": "default"},
+    },
+    "root": {"level": "INFO", "handlers": ["console"]},
+}
+logging.config.dictConfig(LOGGING_CONFIG)
 logger = logging.getLogger(__name__)
 
+# Copy-on-Write makes pandas selections safe without defensive .copy() calls.
+# It is always on from pandas 3.0; opt in explicitly on 2.x (the option is
+# deprecated-and-ignored on 3.x, so only set it where it does something).
+if pd.__version__.startswith("2."):
+    pd.set_option("mode.copy_on_write", True)
+
 # Create App
 app = FastAPI(
     title="Sycamore Credit & Asset Intelligence Platform",
     description="Production-grade Fintech ML Platform with XGBoost Integration",
-    version="1.0.3"
+    version="1.0.3",
+    # orjson serializes the plain-dict responses several times faster than
+    # stdlib json and handles numpy scalars natively (OPT_SERIALIZE_NUMPY),
+    # so payload construction needs no defensive float() casts; our routes
+    # declare no response_model, so no re-validation pass runs either.
+    default_response_class=ORJSONResponse
 )
 
 # CORS Configuration
+# Explicit allowlist only: browsers reject "*" combined with credentials
+# anyway, and a concrete list lets the middleware use a fast set-membership
+# check instead of per-request origin echoing.
 origins = [
     "http://localhost:5173",  # Vite default
     "http://localhost:8080",
     "http://localhost:3000",
     "https://ml-project-ksuh.onrender.com",
-    # Add other domains as needed
-    "*" # Allow all for now as requested by user or checking previous config
+    # Add other deploy domains as needed
 ]
 
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
-    allow_credentials=True, 
+    allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
+# Compress larger JSON responses (SHAP explanations are highly repetitive and
+# compress very well). Level 1 keeps the server-side CPU cost negligible.
+# add_middleware prepends, so this last-added layer is the outermost one:
+# it compresses the response after CORS (inside it) has set its headers.
+app.add_middleware(GZipMiddleware, minimum_size=512, compresslevel=1)
+
 # Import Routers
-# We import explicitly. If other modules are broken, we want to know, 
-# but for production stability of the CREDIT endpoint, we could wrap others.
-# However, standard practice is to fix the code, not suppress import errors.
-try:
-    from app.api import credit
-    app.include_router(credit.router, prefix="/api/credit", tags=["Credit"])
-except ImportError as e:
-    logger.critical(f"Failed to import Credit router: {e}")
-    # We don't exit, but the main feature will be missing.
+# Credit scoring is the core feature: if it cannot be imported the service is
+# useless, so we let that import error propagate instead of suppressing it.
+from app.api import credit
+app.include_router(credit.router, prefix="/api/credit", tags=["Credit"])
 
 try:
     from app.api import financial_health
@@ -57,6 +86,58 @@ try:
 except ImportError as e:
     logger.warning(f"Failed to import Asset Management router: {e}")
 
+# Fully-populated sample request (including derived features) used purely to
+# warm the model at startup so no user pays the cold-start cost.
+_CANNED_SAMPLE = {
+    "LIMIT_BAL": 200000.0, "AGE": 35, "SEX": 2, "EDUCATION": 2, "MARRIAGE": 1,
+    "PAY_0": 0, "PAY_2": 0, "PAY_3": 0, "PAY_4": 0, "PAY_5": 0, "PAY_6": 0,
+    "avg_bill_amt": 45000.0, "avg_pay_amt": 2000.0,
+    "credit_utilization": 0.225, "payment_consistency": 0.044,
+    "late_payment_count": 0, "severe_delinquency": 0,
+    "cashflow_volatility": 3741.66,
+}
+
+@app.on_event("startup")
+def _warmup():
+    """
+    Ensures the model and explainer are fully loaded and runs one dummy
+    prediction plus one SHAP explanation so the first real request (with or
+    without ?explain=true) hits warm code paths instead of paying
+    pickle-load + library initialization latency.
+    """
+    try:
+        from app.services.scoring import get_scoring_service
+        scoring_service = get_scoring_service()
+        if scoring_service.credit_model.model is None:
+            scoring_service.credit_model.load()
+        scoring_service.warmup()
+        scoring_service.predict_credit_score(dict(_CANNED_SAMPLE))
+        logger.info("Model warmup complete.")
+    except Exception as e:
+        # Warmup is best-effort; a failure here should not block serving.
+        logger.warning(f"Model warmup failed: {e}")
+
+@app.on_event("startup")
+async def _start_batchers():
+    """Starts the predict and explain micro-batchers on the serving loop."""
+    try:
+        from app.services.scoring import get_scoring_service
+        scoring_service = get_scoring_service()
+        await scoring_service.batcher.start()
+        await scoring_service.explain_batcher.start()
+    except Exception as e:
+        logger.warning(f"Micro-batchers failed to start: {e}")
+
+@app.on_event("shutdown")
+async def _stop_batchers():
+    try:
+        from app.services.scoring import get_scoring_service
+        scoring_service = get_scoring_service()
+        await scoring_service.batcher.stop()
+        await scoring_service.explain_batcher.stop()
+    except Exception as e:
+        logger.warning(f"Micro-batchers failed to stop cleanly: {e}")
+
 @app.get("/")
 def health_check():
     return {"status": "healthy", "service": "Sycamore Backend", "version": "1.0.3"}
@@ -1,7 +1,5 @@
-from pydantic import BaseModel, Field, model_validator
-import pandas as pd
-from typing import Any, Dict
-from app.services.feature_engineering import compute_features
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr, model_validator
+from typing import Any, Dict, Optional
 
 class CreditScoreRequest(BaseModel):
     # --- Raw Features that are also Model Features ---
@@ -29,6 +27,22 @@ class CreditScoreRequest(BaseModel):
     severe_delinquency: int = Field(..., description="Flag for severe delinquency")
     cashflow_volatility: float = Field(..., description="Standard deviation of bill amounts")
 
+    # Cached plain-dict form of the validated payload (see dict() below)
+    _payload_cache: Optional[Dict[str, Any]] = PrivateAttr(default=None)
+
+    def dict(self, **kwargs):
+        """
+        Returns the validated payload as a plain dict. Validation already ran
+        in the before-validator, so for the common no-argument call we dump the
+        fields once and reuse the result instead of re-walking the model on
+        every access.
+        """
+        if kwargs:
+            return super().dict(**kwargs)
+        if self._payload_cache is None:
+            self._payload_cache = self.model_dump()
+        return self._payload_cache
+
     @model_validator(mode='before')
     @classmethod
     def compute_derived_features(cls, data: Any) -> Any:
@@ -37,28 +51,23 @@ class CreditScoreRequest(BaseModel):
         before Pydantic validation checks for their existence.
         """
         if isinstance(data, dict):
-            # Check if we need to compute features. 
-            # If the raw columns (BILL_AMT...) are present, we should run feature engineering.
-            # Convert dict to DataFrame for feature engineering
+            # Run the centralized feature engineering logic over the raw dict.
+            # The scalar path avoids building a 1-row DataFrame per request.
+            # Imported lazily so merely importing the schema (workers booting,
+            # tooling, OpenAPI generation) does not pull in pandas/numpy.
+            from app.services.feature_engineering import compute_features_scalar
+
             try:
-                # We wrap in list to create a 1-row DataFrame
-                df_input = pd.DataFrame([data])
-                
-                # Run the centralized feature engineering logic
-                # This adds 'avg_bill_amt', etc. to the DataFrame if BILL_AMT exist
-                df_processed = compute_features(df_input)
-                
-                # Extract the computed features back to a dictionary
-                computed_row = df_processed.iloc[0].to_dict()
-                
+                computed = compute_features_scalar(data)
+
                 # Update data with computed features ONLY IF they are not already provided
                 # This allows the User to provide pre-calculated features (like in the example request)
                 # without them being overwritten by 0s because BILL_AMT columns are missing.
-                for key, value in computed_row.items():
+                for key, value in computed.items():
                     if key not in data:
                         data[key] = value
                     # If key is already in data, we respect the user's input
-            
+
             except Exception as e:
                 # In case of computation error, we let validation fail naturally 
                 # or we could raise a specific ValueError
@@ -67,4 +76,6 @@ class CreditScoreRequest(BaseModel):
         return data
 
 class FinancialHealthRequest(CreditScoreRequest):
-    pass
+    # Identical fields to the parent: defer re-compiling the core schema
+    # until this class is actually used, instead of paying it at import.
+    model_config = ConfigDict(defer_build=True)
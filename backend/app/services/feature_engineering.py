@@ -1,66 +1,127 @@
+import math
 import pandas as pd
 import numpy as np
 
-def compute_features(df: pd.DataFrame) -> pd.DataFrame:
+# Raw column groups shared by the DataFrame and scalar paths
+BILL_COLS = [f'BILL_AMT{i}' for i in range(1, 7)]
+PAY_AMT_COLS = [f'PAY_AMT{i}' for i in range(1, 7)]
+PAY_STATUS_COLS = ['PAY_0', 'PAY_2', 'PAY_3', 'PAY_4', 'PAY_5', 'PAY_6']
+
+
+def compute_features_scalar(data: dict) -> dict:
     """
-    Computes required features for credit scoring and financial health.
+    Computes the derived credit features for a single request dict using plain
+    Python arithmetic. Equivalent to compute_features on a 1-row DataFrame but
+    without any pandas allocation, which matters on the per-request hot path.
+    Returns only the derived feature keys.
     """
-    df = df.copy()
+    bills = [float(data[c]) for c in BILL_COLS if data.get(c) is not None]
+    pays = [float(data[c]) for c in PAY_AMT_COLS if data.get(c) is not None]
+    statuses = [float(data[c]) for c in PAY_STATUS_COLS if data.get(c) is not None]
 
-    # Define raw column groups
-    bill_cols = [f'BILL_AMT{i}' for i in range(1, 7)]
-    pay_amt_cols = [f'PAY_AMT{i}' for i in range(1, 7)]
-    pay_status_cols = ['PAY_0', 'PAY_2', 'PAY_3', 'PAY_4', 'PAY_5', 'PAY_6']
+    avg_bill = sum(bills) / len(bills) if bills else 0.0
+    avg_pay = sum(pays) / len(pays) if pays else 0.0
 
-    # 1. Average Bill Amount
-    # Handle missing columns gracefully if for some reason input is partial, though schema enforces all.
-    existing_bill_cols = [c for c in bill_cols if c in df.columns]
-    if existing_bill_cols:
-        df['avg_bill_amt'] = df[existing_bill_cols].mean(axis=1)
+    # Credit Utilization Ratio
+    limit_bal = data.get('LIMIT_BAL')
+    if limit_bal is not None:
+        utilization = avg_bill / (float(limit_bal) or 1.0)
+        utilization = min(max(utilization, 0.0), 1.5)
     else:
-        df['avg_bill_amt'] = 0
+        utilization = 0.0
 
-    # 2. Average Payment Amount
-    existing_pay_amt_cols = [c for c in pay_amt_cols if c in df.columns]
-    if existing_pay_amt_cols:
-        df['avg_pay_amt'] = df[existing_pay_amt_cols].mean(axis=1)
+    # Payment Consistency Ratio. A zero bill total divides by 1 instead,
+    # matching the batch path's np.where(sum_bill == 0, 1, sum_bill) - but
+    # when no bill columns were supplied at all, the batch path returns 0,
+    # so the scalar path must too rather than treating it as a zero sum.
+    if bills:
+        sum_bill = sum(bills)
+        sum_pay = sum(pays)
+        consistency = min(max(sum_pay / (sum_bill or 1.0), 0.0), 2.0)
     else:
-        df['avg_pay_amt'] = 0
+        consistency = 0.0
+
+    late_count = sum(1 for s in statuses if s > 0)
+    severe = int(any(s >= 3 for s in statuses))
+
+    # Cashflow Volatility: sample std of bill amounts (ddof=1, matching pandas)
+    if len(bills) > 1:
+        mean = avg_bill
+        volatility = math.sqrt(sum((b - mean) ** 2 for b in bills) / (len(bills) - 1))
+    else:
+        volatility = 0.0
+
+    return {
+        'avg_bill_amt': avg_bill,
+        'avg_pay_amt': avg_pay,
+        'credit_utilization': utilization,
+        'payment_consistency': consistency,
+        'late_payment_count': late_count,
+        'severe_delinquency': severe,
+        'cashflow_volatility': volatility,
+    }
+
+
+def compute_features(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Computes required features for credit scoring and financial health.
+    """
+    # No defensive copy needed: the input frame is only read, and df.assign
+    # below returns a new frame rather than mutating the caller's.
+    n = len(df)
+
+    # Handle missing columns gracefully if for some reason input is partial, though schema enforces all.
+    existing_bill_cols = [c for c in BILL_COLS if c in df.columns]
+    existing_pay_amt_cols = [c for c in PAY_AMT_COLS if c in df.columns]
+    existing_pay_status = [c for c in PAY_STATUS_COLS if c in df.columns]
+
+    # Extract each column group into one contiguous ndarray up front, so every
+    # derived feature below is a NumPy op on a view rather than a fresh pandas
+    # Series per step.
+    bills = df[existing_bill_cols].to_numpy(dtype=np.float64) if existing_bill_cols else None
+    pays = df[existing_pay_amt_cols].to_numpy(dtype=np.float64) if existing_pay_amt_cols else None
+    status = df[existing_pay_status].to_numpy(dtype=np.float64) if existing_pay_status else None
+
+    # 1. Average Bill Amount / 2. Average Payment Amount
+    avg_bill = bills.mean(axis=1) if bills is not None else np.zeros(n)
+    avg_pay = pays.mean(axis=1) if pays is not None else np.zeros(n)
 
     # 3. Credit Utilization Ratio
-    # Check for LIMIT_BAL
     if 'LIMIT_BAL' in df.columns:
-        df['credit_utilization'] = df['avg_bill_amt'] / df['LIMIT_BAL'].replace(0, 1)
-        df['credit_utilization'] = df['credit_utilization'].clip(0, 1.5)
+        lim = df['LIMIT_BAL'].to_numpy(dtype=np.float64)
+        utilization = np.clip(avg_bill / np.where(lim == 0, 1, lim), 0, 1.5)
     else:
-        df['credit_utilization'] = 0
-
-    # 4. Payment Consistency Ratio
-    sum_pay = df[existing_pay_amt_cols].sum(axis=1) if existing_pay_amt_cols else 0
-    sum_bill = df[existing_bill_cols].sum(axis=1) if existing_bill_cols else 0
-    
-    # Avoid division by zero
-    if isinstance(sum_bill, (int, float)) and sum_bill == 0:
-        df['payment_consistency'] = 0
+        utilization = np.zeros(n)
+
+    # 4. Payment Consistency Ratio (0 when no bill columns at all)
+    if bills is not None:
+        sum_pay = pays.sum(axis=1) if pays is not None else np.zeros(n)
+        sum_bill = bills.sum(axis=1)
+        consistency = np.clip(sum_pay / np.where(sum_bill == 0, 1, sum_bill), 0, 2)
     else:
-        # For series
-        df['payment_consistency'] = sum_pay / sum_bill.replace(0, 1)
-        df['payment_consistency'] = df['payment_consistency'].clip(0, 2)
-
-    # 5. Late Payment Count
-    existing_pay_status = [c for c in pay_status_cols if c in df.columns]
-    if existing_pay_status:
-        df['late_payment_count'] = (df[existing_pay_status] > 0).sum(axis=1)
-        # 6. Severe Delinquency Flag
-        df['severe_delinquency'] = (df[existing_pay_status] >= 3).any(axis=1).astype(int)
+        consistency = np.zeros(n)
+
+    # 5. Late Payment Count / 6. Severe Delinquency Flag
+    if status is not None:
+        late_count = (status > 0).sum(axis=1)
+        severe = (status >= 3).any(axis=1).astype(int)
     else:
-        df['late_payment_count'] = 0
-        df['severe_delinquency'] = 0
+        late_count = np.zeros(n, dtype=int)
+        severe = np.zeros(n, dtype=int)
 
-    # 7. Cashflow Volatility
-    if existing_bill_cols:
-        df['cashflow_volatility'] = df[existing_bill_cols].std(axis=1).fillna(0)
+    # 7. Cashflow Volatility (sample std; NaN for single-column rows -> 0)
+    if bills is not None:
+        volatility = np.nan_to_num(bills.std(axis=1, ddof=1))
     else:
-        df['cashflow_volatility'] = 0
+        volatility = np.zeros(n)
 
-    return df
+    # Single assignment back instead of seven incremental column inserts
+    return df.assign(
+        avg_bill_amt=avg_bill,
+        avg_pay_amt=avg_pay,
+        credit_utilization=utilization,
+        payment_consistency=consistency,
+        late_payment_count=late_count,
+        severe_delinquency=severe,
+        cashflow_volatility=volatility,
+    )
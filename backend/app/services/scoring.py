@@ -1,109 +1,422 @@
+import asyncio
 import os
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from functools import lru_cache
 import pandas as pd
 import numpy as np
 import logging
 from app.models.credit_model import CreditScoringModel
+from app.services.batching import MicroBatcher
+
+# Optional JIT for the pure-numeric hot functions below; the plain Python
+# versions are used when numba is not installed.
+try:
+    import numba
+except ImportError:
+    numba = None
 
 logger = logging.getLogger(__name__)
 
+
+def _safe_float(value) -> float:
+    """Best-effort float coercion: None or unparseable values become 0.0,
+    matching the old pd.to_numeric(errors='coerce').fillna(0) semantics."""
+    if value is None:
+        return 0.0
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _fh_score(lpc, cu, cv, aba, pc):
+    """
+    Core financial-health arithmetic on plain floats. Returns the clipped
+    score and the band as an index into _FH_BANDS (0=Strong, 1=Moderate,
+    2=Fragile). Kept free of dict/string work so numba can compile it to a
+    handful of machine instructions.
+    """
+    score = 100.0 - (lpc * 10.0) - (cu * 25.0) - ((cv / aba) * 20.0) + (pc * 20.0)
+    if score < 0.0:
+        score = 0.0
+    elif score > 100.0:
+        score = 100.0
+
+    if score >= 80.0:
+        band = 0
+    elif score >= 50.0:
+        band = 1
+    else:
+        band = 2
+    return score, band
+
+
+if numba is not None:
+    _fh_score = numba.njit(cache=True, fastmath=True)(_fh_score)
+
+_FH_BANDS = ('Strong', 'Moderate', 'Fragile')
+
+# Risk-tier decision tables: bisecting the thresholds yields an index into
+# the parallel tuples below, replacing the if/elif chain plus the per-tier
+# loan/tenor conditionals with three tuple lookups. Upper-inclusive bounds
+# (pd <= 0.25 is LOW, pd <= 0.55 is MEDIUM) match the original branches.
+_TIER_THRESHOLDS = (0.25, 0.55)
+_TIER_NAMES = ('LOW', 'MEDIUM', 'HIGH')
+_TIER_LOAN_MULT = (1.5, 1.5, 0.5)
+_TIER_TENOR_MONTHS = (24, 24, 12)
+
+
 # Paths
 MODEL_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'models', 'saved_models')
 CREDIT_MODEL_PATH = os.path.join(MODEL_DIR, 'credit_xgboost.pkl')
 EXPLAINER_PATH = os.path.join(MODEL_DIR, 'shap_explainer.pkl')
 
+# Hand-written display names for explainability output; features without an
+# override get a titled version of their name. Keys must match the
+# (case-sensitive) feature names exactly.
+NICE_OVERRIDES = {
+    'LIMIT_BAL': 'Credit Limit',
+    'PAY_0': 'Most Recent Repayment Status',
+    'avg_bill_amt': 'Average Bill Amount',
+    'avg_pay_amt': 'Average Payment Amount',
+    'credit_utilization': 'Credit Utilization',
+    'payment_consistency': 'Payment Consistency',
+    'late_payment_count': 'Late Payment Count',
+    'severe_delinquency': 'Severe Delinquency',
+    'cashflow_volatility': 'Cashflow Volatility',
+}
+
 class ScoringService:
     def __init__(self):
         self.credit_model = CreditScoringModel(CREDIT_MODEL_PATH, EXPLAINER_PATH)
         
-        # Expected Features in exact order matching training
-        self.EXPECTED_FEATURES = [
+        # Expected Features in exact order matching training; a tuple because
+        # the order is fixed at train time and must never be mutated at runtime
+        self.EXPECTED_FEATURES = (
             'LIMIT_BAL', 'AGE', 'SEX', 'EDUCATION', 'MARRIAGE',
             'PAY_0', 'PAY_2', 'PAY_3', 'PAY_4', 'PAY_5', 'PAY_6',
             'avg_bill_amt', 'avg_pay_amt', 'credit_utilization',
             'payment_consistency', 'late_payment_count',
             'severe_delinquency', 'cashflow_volatility'
-        ]
-        
+        )
+
+        # Number of model features, computed once for buffer sizing, and a
+        # frozenset so membership/missing-feature checks need no per-call set()
+        self._n_features = len(self.EXPECTED_FEATURES)
+        self._expected_set = frozenset(self.EXPECTED_FEATURES)
+
+        # Full feature -> display-name table, built once so the explain loop
+        # does a plain dict hit instead of str.replace().title() per feature
+        self._display_names = {
+            f: NICE_OVERRIDES.get(f, f.replace('_', ' ').title())
+            for f in self.EXPECTED_FEATURES
+        }
+
+        # Per-thread reusable input buffer: requests run on pool threads, and
+        # refilling one preallocated row beats allocating a fresh array (or
+        # DataFrame) for every single-row prediction.
+        self._tls = threading.local()
+
+        # In-process response cache. UI clients frequently resubmit the same
+        # feature vector while tweaking unrelated form fields; a hit skips the
+        # whole model pipeline for the cost of a dict lookup. Keys are the 18
+        # model features rounded to 4 decimals. Cached payloads are shared, so
+        # callers must treat them as read-only (they are only serialized).
+        # An explicit OrderedDict LRU rather than functools.lru_cache: both
+        # the sync and async scoring paths need to peek without computing,
+        # which lru_cache cannot do.
+        self._response_cache = OrderedDict()
+        self._response_cache_maxsize = 8192
+        self._response_cache_lock = threading.Lock()
+
+        # Micro-batcher for concurrent requests: started from the FastAPI
+        # startup hook (it needs a running event loop). While running, the
+        # predict step routes through it so concurrent single rows share one
+        # batched model call; otherwise we predict directly.
+        self.batcher = MicroBatcher(self._predict_batch)
+
+        # Separate batcher for SHAP: TreeSHAP amortizes tree traversal across
+        # rows, so concurrent explain=true requests share one explainer call.
+        self.explain_batcher = MicroBatcher(self._explain_batch)
+
         # Initialize
         if not self.credit_model.load():
             logger.warning("Credit Model not found during initialization.")
 
-    def predict_credit_score(self, input_features: dict):
+    def warmup(self):
         """
-        Predict credit score using the XGBoost model.
-        input_features must already contain the derived features.
+        Runs one predict and one SHAP explain on a zero row so first-call
+        setup costs (XGBoost thread-pool creation, TreeSHAP's tree-traversal
+        caches) are paid at startup instead of on the first real request -
+        the first /score?explain=true otherwise sees a large latency spike.
+        Best-effort: a warmup failure must never block serving.
         """
-        # 1. Convert dict to DataFrame
+        dummy = np.zeros((1, self._n_features), dtype=np.float32)
         try:
-            df = pd.DataFrame([input_features])
+            self.credit_model.predict(dummy)
         except Exception as e:
-            raise ValueError(f"Failed to create DataFrame from input: {e}")
-        
-        # 2. explicit feature alignment and ordering
+            logger.warning("Predict warmup failed: %s", e)
+        try:
+            if self.credit_model.explainer is not None:
+                self.credit_model.explain(dummy)
+        except Exception as e:
+            logger.warning("Explainer warmup failed: %s", e)
+
+    def _input_buffer(self) -> np.ndarray:
+        buf = getattr(self._tls, 'buf', None)
+        if buf is None:
+            buf = self._tls.buf = np.empty((1, self._n_features), dtype=np.float32)
+        return buf
+
+    def _cache_key(self, input_features: dict):
+        """
+        Stable hashable key over the model features, coerced exactly the way
+        the scoring buffer is filled so cached and fresh results agree.
+        """
+        return tuple(
+            round(_safe_float(input_features.get(k)), 4)
+            for k in self.EXPECTED_FEATURES
+        )
+
+    def _cache_get(self, key):
+        with self._response_cache_lock:
+            result = self._response_cache.get(key)
+            if result is not None:
+                self._response_cache.move_to_end(key)
+            return result
+
+    def _cache_put(self, key, result):
+        with self._response_cache_lock:
+            self._response_cache[key] = result
+            if len(self._response_cache) > self._response_cache_maxsize:
+                self._response_cache.popitem(last=False)
+
+    def predict_credit_score(self, input_features: dict, with_explanation: bool = False):
+        """
+        Predict credit score using the XGBoost model.
+        input_features must already contain the derived features.
+        Identical feature vectors are served from an in-process LRU cache.
+        SHAP explanation only runs when with_explanation is True.
+        """
+        feat_key = self._cache_key(input_features)
+        result = self._cache_get((feat_key, with_explanation))
+        if result is None:
+            # Score from the canonicalized (rounded) features so a later
+            # cache hit returns exactly what a fresh computation would.
+            result = self._score(dict(zip(self.EXPECTED_FEATURES, feat_key)), with_explanation)
+            self._cache_put((feat_key, with_explanation), result)
+        return result
+
+    async def predict_credit_score_async(self, input_features: dict, with_explanation: bool = False):
+        """
+        Async variant of predict_credit_score for use directly on the event
+        loop. Cache lookup and the dict -> ndarray coercion are microseconds
+        of pure Python and run inline; only the model call (and SHAP, when
+        requested) is awaited, so a handler using this never parks a pool
+        thread for the whole pipeline.
+        """
+        feat_key = self._cache_key(input_features)
+        result = self._cache_get((feat_key, with_explanation))
+        if result is None:
+            result = await self._score_async(
+                dict(zip(self.EXPECTED_FEATURES, feat_key)), with_explanation
+            )
+            self._cache_put((feat_key, with_explanation), result)
+        return result
+
+    def _predict_batch(self, batch: np.ndarray) -> np.ndarray:
+        """Scores a stacked (n, 18) float32 matrix; used by the MicroBatcher."""
+        return np.asarray(self.credit_model.predict(batch))
+
+    def _predict_probability(self, arr: np.ndarray) -> float:
+        """
+        Returns the probability of default for a single (1, 18) row already
+        in model feature order. Routes through the micro-batcher when it is
+        running so concurrent requests amortize one model call; falls back to
+        a direct predict otherwise.
+        """
+        if self.batcher.is_running:
+            try:
+                return float(self.batcher.submit_threadsafe(arr))
+            except Exception as e:
+                logger.warning("Batched predict unavailable, predicting directly: %s", e)
+        return float(self.credit_model.predict(arr)[0])
+
+    def _explain_batch(self, batch: np.ndarray) -> np.ndarray:
+        """SHAP values for a stacked (n, 18) matrix; used by the MicroBatcher."""
+        sv = self.credit_model.explain_batch(batch)
+        if sv is None:
+            raise RuntimeError("No SHAP explainer loaded")
+        return sv
+
+    def _explain_row(self, arr: np.ndarray):
+        """
+        SHAP values for a single row, batched across concurrent requests when
+        the explain batcher is running.
+        """
+        if self.credit_model.explainer is None:
+            return None
+        if self.explain_batcher.is_running:
+            try:
+                return self.explain_batcher.submit_threadsafe(arr)
+            except Exception as e:
+                logger.warning("Batched explain unavailable, explaining directly: %s", e)
+        return self.credit_model.explain(arr)
+
+    def _fill_row(self, arr: np.ndarray, input_features: dict):
+        # Missing, None or unparseable values fall back to 0, matching the
+        # old reindex(fill_value=0) + to_numeric(errors='coerce') behaviour.
+        for i, name in enumerate(self.EXPECTED_FEATURES):
+            arr[0, i] = _safe_float(input_features.get(name))
+
+    def _score(self, input_features: dict, with_explanation: bool = False):
+        # 1. Fill the preallocated buffer in model feature order.
+        buf = self._input_buffer()
+        self._fill_row(buf, input_features)
+
+        # 2. Predict straight from the buffer - the model accepts an ndarray
+        # in feature order, so no DataFrame is built on this path at all.
         try:
-            # Reindex ensures we have exactly the columns we want, in order. 
-            # fill_value=0 handles any accidentally missing derived keys if schema slipped up.
-            X_final = df.reindex(columns=self.EXPECTED_FEATURES, fill_value=0)
+            pd_prob = self._predict_probability(buf)
         except Exception as e:
-             raise ValueError(f"Feature alignment failed: {e}")
+            logger.error("Model prediction failed: %s", e)
+            raise RuntimeError(f"Model inference failed: {str(e)}")
 
-        # 3. Enforce numeric types
-        for col in self.EXPECTED_FEATURES:
-            X_final[col] = pd.to_numeric(X_final[col], errors='coerce').fillna(0)
+        shap_row = None
+        if with_explanation:
+            try:
+                shap_row = self._explain_row(buf)
+            except Exception as e:
+                # Explainability must never break scoring
+                logger.warning("SHAP explanation failed: %s", e)
+
+        return self._build_payload(input_features, pd_prob, shap_row)
+
+    async def _score_async(self, input_features: dict, with_explanation: bool = False):
+        """
+        Event-loop-native scoring: coercion and payload assembly run inline,
+        the model call is awaited on the batcher (or an executor when the
+        batcher is not running). Coroutines interleave on one thread, so each
+        call gets its own row array rather than the thread-local buffer.
+        """
+        arr = np.empty((1, self._n_features), dtype=np.float32)
+        self._fill_row(arr, input_features)
+        loop = asyncio.get_running_loop()
 
-        # 4. Predict
         try:
-            pd_prob = self.credit_model.predict(X_final)[0]
+            if self.batcher.is_running:
+                pd_prob = float(await self.batcher.submit(arr))
+            else:
+                preds = await loop.run_in_executor(None, self.credit_model.predict, arr)
+                pd_prob = float(preds[0])
         except Exception as e:
-            logger.error(f"Model prediction failed: {e}")
+            logger.error("Model prediction failed: %s", e)
             raise RuntimeError(f"Model inference failed: {str(e)}")
-        
-        # Logic
+
+        shap_row = None
+        if with_explanation and self.credit_model.explainer is not None:
+            try:
+                if self.explain_batcher.is_running:
+                    shap_row = await self.explain_batcher.submit(arr)
+                else:
+                    shap_row = await loop.run_in_executor(None, self.credit_model.explain, arr)
+            except Exception as e:
+                logger.warning("SHAP explanation failed: %s", e)
+
+        return self._build_payload(input_features, pd_prob, shap_row)
+
+    def _build_payload(self, input_features: dict, pd_prob: float, shap_row):
         credit_score = int(round((1 - pd_prob) * 100))
-        
-        if pd_prob <= 0.25:
-            risk_tier = "LOW"
-        elif pd_prob <= 0.55:
-            risk_tier = "MEDIUM"
-        else:
-            risk_tier = "HIGH"
-            
+
+        tier = bisect_left(_TIER_THRESHOLDS, pd_prob)
+        risk_tier = _TIER_NAMES[tier]
+
+        # Explainability (opt-in): positive SHAP values push the predicted
+        # default probability up, negative values pull it down.
+        top_positive = []
+        top_negative = []
+        if shap_row is not None:
+            # Sort the raw SHAP array once in C and take three indices off
+            # each end; only the (up to) six reported entries ever become
+            # Python objects. Each list stays ordered most-impactful-first.
+            sv = np.asarray(shap_row)
+            order = np.argsort(sv)
+            top_positive = [
+                {"feature": self._display_names[self.EXPECTED_FEATURES[i]],
+                 "impact": round(float(sv[i]), 5)}
+                for i in order[:-4:-1] if sv[i] > 0
+            ]
+            top_negative = [
+                {"feature": self._display_names[self.EXPECTED_FEATURES[i]],
+                 "impact": round(float(sv[i]), 5)}
+                for i in order[:3] if sv[i] < 0
+            ]
+
+        # No float(...) casts here: pd_prob is coerced to a Python float once
+        # at the predict call sites, and orjson serializes numpy scalars
+        # natively anyway (ORJSONResponse enables OPT_SERIALIZE_NUMPY).
         return {
             "credit_score": float(credit_score),
-            "probability_of_default": float(pd_prob),
+            "probability_of_default": pd_prob,
             "risk_tier": risk_tier,
-            "recommended_loan_amount": float(input_features.get('LIMIT_BAL', 0)) * (0.5 if risk_tier == 'HIGH' else 1.5),
-            "recommended_tenor_months": 12 if risk_tier == 'HIGH' else 24,
+            "recommended_loan_amount": _safe_float(input_features.get('LIMIT_BAL')) * _TIER_LOAN_MULT[tier],
+            "recommended_tenor_months": _TIER_TENOR_MONTHS[tier],
             "currency": "NGN",
             "explainability": {
-                "top_positive_factors": [],
-                "top_negative_factors": []
+                "top_positive_factors": top_positive,
+                "top_negative_factors": top_negative
             }
         }
 
     def calculate_financial_health(self, features: dict):
-        lpc = features.get('late_payment_count', 0)
-        cu = features.get('credit_utilization', 0)
-        cv = features.get('cashflow_volatility', 0)
-        aba = features.get('avg_bill_amt', 1)
-        if aba is None or aba == 0: aba = 1
-        pc = features.get('payment_consistency', 0)
-        
-        score = 100 - (lpc * 10) - (cu * 25) - ((cv / aba) * 20) + (pc * 20)
-        score = max(0, min(100, score))
-        
-        if score >= 80:
-            band = "Strong"
-        elif score >= 50:
-            band = "Moderate"
-        else:
-            band = "Fragile"
-            
+        aba = _safe_float(features.get('avg_bill_amt', 1))
+        if aba == 0:
+            aba = 1.0
+
+        score, band = _fh_score(
+            _safe_float(features.get('late_payment_count')),
+            _safe_float(features.get('credit_utilization')),
+            _safe_float(features.get('cashflow_volatility')),
+            aba,
+            _safe_float(features.get('payment_consistency')),
+        )
+
         return {
             "financial_health_score": round(score, 2),
-            "health_band": band
+            "health_band": _FH_BANDS[band]
         }
-    
+
+    def calculate_financial_health_batch(self, df: pd.DataFrame):
+        """
+        Vectorized calculate_financial_health for a whole DataFrame of
+        profiles (portfolio scoring, backtests). Missing columns fall back to
+        the same defaults as the scalar path. Returns a struct-of-arrays dict
+        with one score and band entry per row.
+        """
+        n = len(df)
+
+        def col(name, default):
+            if name in df.columns:
+                return df[name].to_numpy(dtype=np.float64)
+            return np.full(n, float(default))
+
+        lpc = col('late_payment_count', 0)
+        cu = col('credit_utilization', 0)
+        cv = col('cashflow_volatility', 0)
+        aba = col('avg_bill_amt', 1)
+        aba = np.where(aba == 0, 1, aba)
+        pc = col('payment_consistency', 0)
+
+        score = np.clip(100 - (lpc * 10) - (cu * 25) - ((cv / aba) * 20) + (pc * 20), 0, 100)
+        bands = np.select([score >= 80, score >= 50], ['Strong', 'Moderate'], default='Fragile')
+
+        return {
+            "financial_health_score": np.round(score, 2),
+            "health_band": bands
+        }
+
     def get_asset_recommendation(self, profile: dict):
         # Placeholder or simplified logic if InvestmentModel is missing
         # To avoid dependency hell, I'll implement simple logic here or try to import InvestmentModel
@@ -130,4 +443,11 @@ class ScoringService:
             "portfolio_allocation": alloc
         }
 
-scoring_service = ScoringService()
+@lru_cache(maxsize=1)
+def get_scoring_service() -> ScoringService:
+    """
+    Lazy process-wide singleton. Constructing ScoringService loads the model
+    artifacts from disk, so defer that to first use instead of import time -
+    tooling and tests import this module without ever scoring anything.
+    """
+    return ScoringService()